@@ -0,0 +1,113 @@
+import pygame
+from render import to_display_format
+from settings import TILE_SIZE, WALL_COLOR, PATH_COLOR, ZOOM_LEVELS
+
+TRAP_COLOR = (200, 0, 0)
+PORTAL_COLOR = (100, 255, 255)
+
+
+def build_wall(size, color):
+    surf = pygame.Surface(size)
+    surf.fill(color)
+    for i in range(0, size[0], 4):
+        pygame.draw.line(surf, (50, 50, 70), (i, 0), (i, size[1]))
+    for i in range(0, size[1], 4):
+        pygame.draw.line(surf, (50, 50, 70), (0, i), (size[0], i))
+    return surf
+
+
+def build_fill(size, color):
+    surf = pygame.Surface(size)
+    surf.fill(color)
+    return surf
+
+
+def build_marker(size, color):
+    surf = pygame.Surface(size, pygame.SRCALPHA)
+    pygame.draw.circle(surf, color, (size[0] // 2, size[1] // 2), 5)
+    return surf
+
+
+def build_health_bar(size, hp_and_max):
+    hp, max_hp = hp_and_max
+    surf = pygame.Surface(size)
+    pygame.draw.rect(surf, (100, 0, 0), (0, 0, *size))
+    pygame.draw.rect(surf, (0, 255, 0), (0, 0, int(size[0] * (hp / max_hp)), size[1]))
+    pygame.draw.rect(surf, (255, 255, 255), (0, 0, *size), 2)
+    return surf
+
+
+BUILDERS = {
+    "wall": build_wall,
+    "fill": build_fill,
+    "marker": build_marker,
+    "health": build_health_bar,
+}
+
+# tiles packed side by side into one atlas per tile size and zoom level
+TILE_KINDS = [
+    ("wall", "wall", WALL_COLOR),
+    ("path", "fill", PATH_COLOR),
+    ("trap", "marker", TRAP_COLOR),
+    ("portal", "marker", PORTAL_COLOR),
+]
+
+
+class AssetCache:
+    def __init__(self, zoom_levels=ZOOM_LEVELS):
+        self.zoom_levels = zoom_levels
+        self.surfaces = {}
+        self.tile_sets = {}
+        self.stats = {"built": 0, "hits": 0}
+
+    def finish(self, surface, alpha, surface_alpha):
+        surface = to_display_format(surface, alpha)
+        if surface_alpha is not None:
+            surface.set_alpha(surface_alpha)
+        return surface
+
+    def scaled(self, surface, zoom):
+        if zoom == 1.0:
+            return surface
+        return pygame.transform.scale(surface, (round(surface.get_width() * zoom), round(surface.get_height() * zoom)))
+
+    def get(self, kind, size, params, zoom=1.0, surface_alpha=None, zoomable=True):
+        # screen-space surfaces like the HUD pass zoomable=False and only get the 1.0 variant
+        size = (int(size[0]), int(size[1]))
+        key = (kind, size, params, surface_alpha)
+        variants = self.surfaces.get(key)
+        if variants is None:
+            base = BUILDERS[kind](size, params)
+            alpha = bool(base.get_flags() & pygame.SRCALPHA)
+            zooms = self.zoom_levels if zoomable else (1.0,)
+            variants = {z: self.finish(self.scaled(base, z), alpha, surface_alpha) for z in zooms}
+            self.surfaces[key] = variants
+            self.stats["built"] += len(variants)
+        else:
+            self.stats["hits"] += 1
+        return variants[zoom]
+
+    def tiles(self, size=TILE_SIZE, zoom=1.0):
+        tile_set = self.tile_sets.get((size, zoom))
+        if tile_set is None:
+            self.build_tile_sets(size)
+            tile_set = self.tile_sets[(size, zoom)]
+        else:
+            self.stats["hits"] += 1
+        return tile_set
+
+    def build_tile_sets(self, size):
+        atlas = pygame.Surface((size * len(TILE_KINDS), size), pygame.SRCALPHA)
+        for i, (_, builder, color) in enumerate(TILE_KINDS):
+            atlas.blit(BUILDERS[builder]((size, size), color), (i * size, 0))
+
+        for zoom in self.zoom_levels:
+            scaled = to_display_format(self.scaled(atlas, zoom), alpha=True)
+            step = round(size * zoom)
+            self.tile_sets[(size, zoom)] = {
+                name: scaled.subsurface((i * step, 0, step, step)) for i, (name, _, _) in enumerate(TILE_KINDS)
+            }
+            self.stats["built"] += 1
+
+
+assets = AssetCache()
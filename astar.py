@@ -1,4 +1,7 @@
 import heapq
+import time
+
+stats = {"calls": 0, "failures": 0, "expansions": 0, "time": 0.0}
 
 def heuristic(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
@@ -14,6 +17,8 @@ def neighbors(node, grid):
     return results
 
 def astar(grid, start, goal):
+    started = time.perf_counter()
+    expansions = 0
     frontier = []
     heapq.heappush(frontier, (0, start))
     came_from = {start: None}
@@ -21,6 +26,7 @@ def astar(grid, start, goal):
 
     while frontier:
         _, current = heapq.heappop(frontier)
+        expansions += 1
         if current == goal:
             break
 
@@ -33,10 +39,15 @@ def astar(grid, start, goal):
                 came_from[nxt] = current
 
 
+    stats["calls"] += 1
+    stats["expansions"] += expansions
+    stats["time"] += time.perf_counter() - started
+
     path = []
     cur = goal
     while cur != start:
         if cur not in came_from:
+            stats["failures"] += 1
             return [] 
         path.append(cur)
         cur = came_from[cur]
@@ -0,0 +1,40 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from render import FONT_CACHE_PATH
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def time_to_first_frame(env):
+    started = time.time()
+    result = subprocess.run([sys.executable, os.path.join(HERE, "main.py")], env=env,
+                            capture_output=True, text=True, check=True)
+    for line in result.stdout.splitlines():
+        if line.startswith("first_frame "):
+            return float(line.split()[1]) - started
+    raise RuntimeError("main.py exited without reporting its first frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time from process start to the first presented frame")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--cold", action="store_true", help="delete the font cache before every run")
+    args = parser.parse_args()
+
+    env = dict(os.environ, GAME_EXIT_AFTER_FIRST_FRAME="1")
+    samples = []
+    for _ in range(args.runs):
+        if args.cold and os.path.exists(FONT_CACHE_PATH):
+            os.remove(FONT_CACHE_PATH)
+        samples.append(time_to_first_frame(env) * 1000)
+
+    print(f"time to first frame over {args.runs} runs: median {statistics.median(samples):.1f} ms, "
+          f"min {min(samples):.1f} ms, max {max(samples):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
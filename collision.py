@@ -0,0 +1,70 @@
+import math
+import pygame
+from settings import TILE_SIZE
+
+# boxes include their right and bottom edge, like the old corner checks
+EPSILON = 1e-4
+
+
+def covered(start, length):
+    return range(int(start // TILE_SIZE), int((start + length) // TILE_SIZE) + 1)
+
+
+def crossing_time(edge, line, velocity):
+    if velocity == 0:
+        return math.inf
+    return (line - edge) / velocity
+
+
+def sweep(tilemap, pos, size, move):
+    # walks the tile boundaries the leading edges cross in time order (DDA),
+    # so a move longer than a wall is thick still stops at the wall
+    x, y = pos.x, pos.y
+    w, h = size.x, size.y
+    dx, dy = move.x, move.y
+    normals = []
+
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    # index of the column/row the leading edge is in
+    col = int((x + w) // TILE_SIZE) if dx > 0 else int(x // TILE_SIZE)
+    row = int((y + h) // TILE_SIZE) if dy > 0 else int(y // TILE_SIZE)
+
+    t = 0.0
+    while True:
+        line_x = (col + 1) * TILE_SIZE - w if dx > 0 else col * TILE_SIZE
+        line_y = (row + 1) * TILE_SIZE - h if dy > 0 else row * TILE_SIZE
+        tx = crossing_time(x, line_x, dx)
+        ty = crossing_time(y, line_y, dy)
+        t_next = min(tx, ty)
+        if t + t_next >= 1:
+            x += dx * (1 - t)
+            y += dy * (1 - t)
+            break
+        x += dx * t_next
+        y += dy * t_next
+        t += t_next
+
+        if tx <= ty:
+            x = line_x
+            blocked = any(tilemap.is_wall(col + step_x, r) for r in covered(y, h))
+            if blocked:
+                dx = 0
+                normals.append((-step_x, 0))
+            else:
+                col += step_x
+            # on the line a right edge already counts as the next column, a left edge not yet
+            if blocked == (step_x > 0):
+                x -= EPSILON
+        else:
+            y = line_y
+            blocked = any(tilemap.is_wall(c, row + step_y) for c in covered(x, w))
+            if blocked:
+                dy = 0
+                normals.append((0, -step_y))
+            else:
+                row += step_y
+            if blocked == (step_y > 0):
+                y -= EPSILON
+
+    return pygame.Vector2(x, y), normals
@@ -0,0 +1,203 @@
+import math
+import time
+import astar
+from assets import assets
+from settings import WIDTH, HEIGHT, TILE_SIZE
+from telemetry import trace
+
+# regen refuses anything bigger, the grid and its renders are rebuilt on every reset
+MAX_MAP_SIZE = 1000
+
+
+class CommandRegistry:
+    def __init__(self):
+        self.commands = {}
+
+    def register(self, name, usage=""):
+        def decorator(func):
+            self.commands[name] = (func, usage)
+            return func
+        return decorator
+
+    def execute(self, game, line):
+        parts = line.split()
+        if not parts:
+            return []
+        name, args = parts[0].lower(), parts[1:]
+        if name not in self.commands:
+            return [f"Unknown command: {' '.join(parts)}"]
+        func, usage = self.commands[name]
+        try:
+            return func(game, args)
+        except (ValueError, IndexError):
+            return [f"Usage: {name} {usage}".rstrip()]
+
+
+commands = CommandRegistry()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(fraction * len(ordered)))
+    return ordered[index]
+
+
+class FrameBenchmark:
+    # ticked once per frame by the main loop, so a long run never blocks rendering
+    def __init__(self, duration):
+        self.duration = duration
+        self.started = None
+        self.frame_times = []
+        self.work_times = []
+        self.done = False
+
+    def update(self, frame_ms, work_ms):
+        now = time.perf_counter()
+        if self.started is None:
+            self.started = now
+            return []
+        self.frame_times.append(frame_ms)
+        self.work_times.append(work_ms)
+        if now - self.started < self.duration:
+            return []
+
+        self.done = True
+        fps = len(self.frame_times) / (now - self.started)
+        lines = [f"Bench: {len(self.frame_times)} frames, {fps:.1f} fps"]
+        for label, values in (("frame", self.frame_times), ("work", self.work_times)):
+            lines.append(
+                f"{label} ms p50 {percentile(values, 0.5):.2f} p90 {percentile(values, 0.9):.2f} "
+                f"p99 {percentile(values, 0.99):.2f} max {max(values):.2f}"
+            )
+        return lines
+
+
+@commands.register("level", "<n>")
+def level_command(game, args):
+    game.reset(int(args[0]))
+    return [f"Level set to {game.level}"]
+
+
+@commands.register("next")
+def next_command(game, args):
+    game.reset(game.level + 1)
+    return [f"Skipped to level {game.level}"]
+
+
+@commands.register("reset")
+def reset_command(game, args):
+    game.reset()
+    return ["Level reset"]
+
+
+@commands.register("heal")
+def heal_command(game, args):
+    game.player.hp = game.player.max_hp
+    return ["Player healed"]
+
+
+@commands.register("spawn", "[n]")
+def spawn_command(game, args):
+    count = int(args[0]) if args else 1
+    if count < 1:
+        raise ValueError(count)
+    game.spawn_enemies(count)
+    return [f"Spawned {count}, {len(game.enemies)} enemies total"]
+
+
+@commands.register("regen", "<cols> <rows> [seed]")
+def regen_command(game, args):
+    cols, rows = int(args[0]), int(args[1])
+    if not (5 <= cols <= MAX_MAP_SIZE and 5 <= rows <= MAX_MAP_SIZE):
+        raise ValueError((cols, rows))
+    game.map_size = (cols, rows)
+    game.seed = int(args[2]) if len(args) > 2 else None
+    game.reset()
+    lines = [f"Regenerated {cols}x{rows} map, seed {game.seed}"]
+    if cols * TILE_SIZE > WIDTH or rows * TILE_SIZE > HEIGHT:
+        # there is no camera, anything past the screen edge is simulated but never drawn
+        lines.append(f"Larger than the {WIDTH // TILE_SIZE}x{HEIGHT // TILE_SIZE} screen: for load testing only")
+    return lines
+
+
+@commands.register("speed", "<multiplier>")
+def speed_command(game, args):
+    multiplier = float(args[0])
+    if not math.isfinite(multiplier) or multiplier < 0:
+        raise ValueError(multiplier)
+    game.speed_multiplier = multiplier
+    return [f"Enemy speed multiplier {game.speed_multiplier}"]
+
+
+@commands.register("bench", "<seconds>")
+def bench_command(game, args):
+    duration = float(args[0])
+    if not math.isfinite(duration) or duration <= 0:
+        raise ValueError(duration)
+    game.tasks.append(FrameBenchmark(duration))
+    return [f"Benchmarking {duration:g} s, close the console to measure gameplay"]
+
+
+@commands.register("workers", "<n>")
+def workers_command(game, args):
+    count = int(args[0])
+    if count < 0:
+        raise ValueError(count)
+    game.set_path_workers(count)
+    if not count:
+        return ["Pathfinding back on the main thread"]
+    return [f"Pathfinding on {count} worker processes"]
+
+
+@commands.register("stats", "[reset]")
+def stats_command(game, args):
+    import hpa
+    if args and args[0].lower() == "reset":
+        counters_list = [astar.stats, hpa.stats, game.renderer.stats]
+        if game.path_pool:
+            counters_list.append(game.path_pool.stats)
+        for counters in counters_list:
+            for key in counters:
+                counters[key] = type(counters[key])()
+        return ["Counters reset"]
+    a = astar.stats
+    h = hpa.stats
+    r = game.renderer.stats
+    frames = max(r["frames"], 1)
+    s = assets.stats
+    lines = [
+        f"A*: {a['calls']} calls, {a['failures']} failed, {a['expansions']} expanded, {a['time'] * 1000:.1f} ms",
+        f"HPA*: {h['queries']} queries, {h['failures']} failed, {h['rebuilds']} rebuilds, {h['time'] * 1000:.1f} ms",
+        f"Render: {r['frames']} frames, {r['full_redraws']} full, {r['blits'] / frames:.1f} blits/frame",
+        f"Render: {r['rects'] / frames:.1f} rects/frame, {r['pixels'] / frames:.0f} px/frame",
+        f"Assets: {s['built']} surfaces built, {s['hits']} cache hits",
+    ]
+    if game.path_pool:
+        w = game.path_pool.stats
+        lines.append(f"Workers: {len(game.path_pool.processes)} procs, {w['submitted']} submitted, "
+                     f"{w['completed']} done, {w['outdated']} outdated")
+    return lines
+
+
+@commands.register("trace", "<start|stop> [file]")
+def trace_command(game, args):
+    action = args[0].lower()
+    if action == "start":
+        path = args[1] if len(args) > 1 else "game.trace"
+        trace.start(path)
+        return [f"Tracing to {path}"]
+    if action == "stop":
+        if not trace.active:
+            return ["Not tracing"]
+        trace.stop()
+        return [f"Trace written to {trace.path}"]
+    raise ValueError(args[0])
+
+
+@commands.register("help")
+def help_command(game, args):
+    entries = [f"{name} {usage}".rstrip() for name, (_, usage) in commands.commands.items()]
+    lines = ["Available: " + ", ".join(entries[:4])]
+    for i in range(4, len(entries), 4):
+        lines.append("  " + ", ".join(entries[i:i + 4]))
+    return lines
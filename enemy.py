@@ -1,12 +1,19 @@
 import pygame
 import time
+import itertools
 from typing import List, Tuple
-from astar import astar
+from assets import assets
+from collision import sweep
+from telemetry import trace, PATH, WORKER_PATH, PATH_CHASE, PATH_RETURN, STATE, STATE_IDS, pack_cell
 from settings import (
     TILE_SIZE, ENEMY_COLOR, SHADOW_COLOR, 
-    MAP_COLS, SHADOW_OFFSET, MAP_ROWS
+    SHADOW_OFFSET
 )
 
+_enemy_ids = itertools.count()
+# the slow power-up's speed_mod (1.0) used to land in player_hp, adding (100 - 1) * 1.5
+SIGHT_BONUS = 148.5
+
 class Enemy:
     def __init__(
         self, 
@@ -27,15 +34,18 @@ class Enemy:
         self.lose_radius = lose_radius
         self.tilemap = tilemap
         self._setup_visuals()
+        self.id = next(_enemy_ids)
+        self._state = None
         self.state = "patrol"
         self.patrol_points = [
             pygame.Vector2(TILE_SIZE + 5, TILE_SIZE + 5),
-            pygame.Vector2((MAP_COLS - 2) * TILE_SIZE + 5, TILE_SIZE + 5)
+            pygame.Vector2((tilemap.cols - 2) * TILE_SIZE + 5, TILE_SIZE + 5)
         ]
         self.current_patrol_index = 0
         self.chase_target_pos = None
         self.path: List[Tuple[int, int]] = []
         self.path_index = 0
+        self.path_request = None
         self.last_path_calc_time = 0
         self.path_recalc_interval = 0.6
         self.last_explosion_time = 0
@@ -43,19 +53,28 @@ class Enemy:
         self.last_player_seen_time = 0
 
     def _setup_visuals(self) -> None:
-        self.image = pygame.Surface(self.size, pygame.SRCALPHA)
-        pygame.draw.rect(self.image, ENEMY_COLOR, (0, 0, *self.size))
-        self.shadow = pygame.Surface(self.size, pygame.SRCALPHA)
-        shadow_color = (*SHADOW_COLOR[:3], SHADOW_COLOR[3])
-        pygame.draw.rect(self.shadow, shadow_color, (0, 0, *self.size))
+        self.image = assets.get("fill", self.size, ENEMY_COLOR)
+        self.shadow = assets.get("fill", self.size, SHADOW_COLOR[:3], surface_alpha=SHADOW_COLOR[3])
         self.wait_time = 0  
         self.wait_duration = 1.0  
 
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @state.setter
+    def state(self, value: str) -> None:
+        if value != self._state:
+            self._state = value
+            trace.record(STATE, STATE_IDS[value], a=self.id)
+
     def update(self, player_pos, player_hp=100, speed_multiplier=1.0):
         now = time.time()
         dist_to_player = self.pos.distance_to(player_pos)
-        dynamic_detect_radius = self.detect_radius + (100 - player_hp) * 1.5 
-        dynamic_lose_radius = self.lose_radius + (100 - player_hp) * 1.5
+        # up to 1.5x the level radius at low hp, plus the fixed sight bonus enemies always had
+        hp_scale = 1 + (1 - player_hp / 100) * 0.5
+        dynamic_detect_radius = self.detect_radius * hp_scale + SIGHT_BONUS
+        dynamic_lose_radius = dynamic_detect_radius + self.lose_radius - self.detect_radius
 
         if dist_to_player <= dynamic_detect_radius:
             self.last_player_seen_time = now
@@ -71,6 +90,7 @@ class Enemy:
             self.state = "chase"
             self.path = []
             self.path_index = 0
+            self.cancel_path_request()
         elif self.state == "chase" and (
             dist_to_player > dynamic_lose_radius and 
             now - self.last_player_seen_time >= 3.0
@@ -78,6 +98,7 @@ class Enemy:
             self.state = "return"
             self.path = []
             self.path_index = 0
+            self.cancel_path_request()
             self.chase_target_pos = self.patrol_points[self.current_patrol_index]
 
         if self.state == "patrol":
@@ -98,7 +119,7 @@ class Enemy:
                     continue  
                 nx = tile_x + dx
                 ny = tile_y + dy
-                if 0 <= nx < MAP_COLS and 0 <= ny < MAP_ROWS:
+                if 0 <= nx < self.tilemap.cols and 0 <= ny < self.tilemap.rows:
                     if self.tilemap.is_wall(nx, ny):
                         self.tilemap.remove_wall(nx, ny)
 
@@ -118,8 +139,7 @@ class Enemy:
         if now - self.last_path_calc_time > self.path_recalc_interval or not self.path:
             start_cell = (int(self.pos.x // TILE_SIZE), int(self.pos.y // TILE_SIZE))
             goal_cell = (int(player_pos.x // TILE_SIZE), int(player_pos.y // TILE_SIZE))
-            self.path = astar(self.tilemap.map, start_cell, goal_cell)
-            self.path_index = 0
+            self.request_path(start_cell, goal_cell)
             self.last_path_calc_time = now
         if self.path and self.path_index < len(self.path):
             target_cell = self.path[self.path_index]
@@ -133,13 +153,63 @@ class Enemy:
                 predicted_pos = player_pos + direction.normalize() * 10  
                 self.move_smooth(predicted_pos, self.chase_speed * speed_multiplier)
 
+    def request_path(self, start_cell, goal_cell, purpose=PATH_CHASE):
+        pool = self.tilemap.path_pool
+        if pool is None:
+            self.path = self.plan_path(start_cell, goal_cell, purpose)
+            self.path_index = 0
+            return
+        if self.path_request is not None:
+            return
+        # keep following the old path until the worker answers
+        target = self.path_target(start_cell, goal_cell)
+        if target is None:
+            self.path = []
+            self.path_index = 0
+            return
+
+        def receive(request_id, path, expansions, started, search_ms):
+            if request_id != self.path_request:
+                return
+            self.path_request = None
+            self.path = path
+            self.path_index = 0
+            # the search ran in a worker, so it is not part of this frame's update time
+            trace.record(WORKER_PATH, purpose, pack_cell(start_cell), pack_cell(goal_cell),
+                         expansions, self.id, search_ms, t=started)
+
+        self.path_request = pool.submit(start_cell, target, receive)
+
+    def cancel_path_request(self):
+        if self.path_request is not None and self.tilemap.path_pool:
+            self.tilemap.path_pool.cancel(self.path_request)
+        self.path_request = None
+
+    def path_target(self, start_cell, goal_cell):
+        # an unreachable goal is rejected up front; head for the closest cell we can reach instead
+        if self.tilemap.reachable(start_cell, goal_cell):
+            return goal_cell
+        return self.tilemap.nearest_reachable(start_cell, goal_cell)
+
+    def plan_path(self, start_cell, goal_cell, purpose=PATH_CHASE):
+        started = time.perf_counter()
+        expansions = self.tilemap.path_expansions()
+        target = self.path_target(start_cell, goal_cell)
+        path = self.tilemap.find_path(start_cell, target) if target is not None else []
+        if trace.active:
+            expansions = self.tilemap.path_expansions() - expansions
+            trace.record(PATH, purpose, pack_cell(start_cell), pack_cell(goal_cell),
+                         expansions, self.id, (time.perf_counter() - started) * 1000, t=started)
+        return path
+
     def return_to_patrol(self, speed_multiplier, now):
         if not self.path or self.path_index >= len(self.path):
             start_cell = (int(self.pos.x // TILE_SIZE), int(self.pos.y // TILE_SIZE))
             goal_cell = (int(self.chase_target_pos.x // TILE_SIZE), int(self.chase_target_pos.y // TILE_SIZE))
-            self.path = astar(self.tilemap.map, start_cell, goal_cell)
-            self.path_index = 0
+            self.request_path(start_cell, goal_cell, PATH_RETURN)
             self.last_path_calc_time = now
+        if self.path_request is not None and self.tilemap.path_pool:
+            return
         if self.path and self.path_index < len(self.path):
             target_cell = self.path[self.path_index]
             target_pos = pygame.Vector2(target_cell[0] * TILE_SIZE + TILE_SIZE/2, target_cell[1] * TILE_SIZE + TILE_SIZE/2)
@@ -161,35 +231,15 @@ class Enemy:
         self.velocity += steering
         if self.velocity.length() > max_speed:
             self.velocity.scale_to_length(max_speed)
-        next_pos = self.pos + self.velocity
-        if not self.collides(next_pos):
-            self.pos = next_pos
-        else:
-            if not self.collides(self.pos + pygame.Vector2(self.velocity.x, 0)):
-                self.pos.x += self.velocity.x
-                self.velocity.y = 0
-            elif not self.collides(self.pos + pygame.Vector2(0, self.velocity.y)):
-                self.pos.y += self.velocity.y
+        self.pos, normals = sweep(self.tilemap, self.pos, self.size, self.velocity)
+        # slide along whatever was hit
+        for nx, ny in normals:
+            if nx:
                 self.velocity.x = 0
-            else:
-                self.velocity = pygame.Vector2(0, 0)
+            if ny:
+                self.velocity.y = 0
         return distance < max_speed
 
-    def collides(self, pos):
-        corners = [
-            pos,
-            pos + pygame.Vector2(self.size.x, 0),
-            pos + pygame.Vector2(0, self.size.y),
-            pos + self.size
-        ]
-        for corner in corners:
-            tile_x = int(corner.x // TILE_SIZE)
-            tile_y = int(corner.y // TILE_SIZE)
-            if self.tilemap.is_wall(tile_x, tile_y):
-                return True
-        return False
-
-    def draw(self, screen):
+    def sprites(self):
         shadow_pos = self.pos + pygame.Vector2(SHADOW_OFFSET)
-        screen.blit(self.shadow, shadow_pos)
-        screen.blit(self.image, self.pos)
+        return [(self.shadow, shadow_pos), (self.image, self.pos)]
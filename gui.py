@@ -1,4 +1,3 @@
-import pygame
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import random
@@ -25,9 +24,6 @@ class MapEditor:
         self.current_tool = "wall"  
         self.drawing = False
         
-
-        pygame.init()
-        
         self.setup_ui()
         
     def setup_ui(self):
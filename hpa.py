@@ -0,0 +1,320 @@
+import heapq
+import time
+from collections import OrderedDict, deque
+from astar import heuristic
+
+stats = {"queries": 0, "failures": 0, "rebuilds": 0, "fields": 0, "expansions": 0, "time": 0.0}
+
+STEPS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+class HierarchicalPlanner:
+    def __init__(self, grid, cols, rows, cluster_size=16, max_fields=8):
+        self.grid = grid
+        self.cols = cols
+        self.rows = rows
+        self.cluster_size = cluster_size
+        self.cluster_cols = (cols + cluster_size - 1) // cluster_size
+        self.cluster_rows = (rows + cluster_size - 1) // cluster_size
+
+        # entrance pairs per border, keyed (cluster, right or lower neighbour)
+        self.border_pairs = {}
+        # abstract graph: inter-cluster links and intra-cluster distances between entrance cells
+        self.inter = {}
+        self.cluster_nodes = {}
+        self.intra = {}
+        self.links = {}
+        # caches over the abstract graph, dropped whenever it changes
+        self.max_fields = max_fields
+        self.fields = OrderedDict()
+        self.goal_requests = {}
+        self.segments = {}
+        self.dirty = {(cx, cy) for cy in range(self.cluster_rows) for cx in range(self.cluster_cols)}
+
+    def cluster_of(self, cell):
+        return (cell[0] // self.cluster_size, cell[1] // self.cluster_size)
+
+    def bounds(self, cluster):
+        x0 = cluster[0] * self.cluster_size
+        y0 = cluster[1] * self.cluster_size
+        return x0, y0, min(x0 + self.cluster_size, self.cols), min(y0 + self.cluster_size, self.rows)
+
+    def invalidate(self, x, y):
+        self.dirty.add(self.cluster_of((x, y)))
+
+    def neighbour_clusters(self, cluster):
+        cx, cy = cluster
+        for dx, dy in STEPS:
+            nx, ny = cx + dx, cy + dy
+            if 0 <= nx < self.cluster_cols and 0 <= ny < self.cluster_rows:
+                yield (nx, ny)
+
+    def border_key(self, a, b):
+        return (a, b) if a < b else (b, a)
+
+    def compute_border(self, a, b):
+        grid = self.grid
+        x0, y0, x1, y1 = self.bounds(a)
+        if b[0] != a[0]:
+            xa = x1 - 1
+            crossings = [((xa, y), (xa + 1, y)) for y in range(y0, y1)]
+        else:
+            ya = y1 - 1
+            crossings = [((x, ya), (x, ya + 1)) for x in range(x0, x1)]
+
+        # one entrance in the middle of every run of open crossings
+        pairs = []
+        run = []
+        for cell_a, cell_b in crossings + [(None, None)]:
+            if cell_a is not None and grid[cell_a[1]][cell_a[0]] == 0 and grid[cell_b[1]][cell_b[0]] == 0:
+                run.append((cell_a, cell_b))
+            elif run:
+                pairs.append(run[len(run) // 2])
+                run = []
+        return pairs
+
+    def local_distances(self, source, cluster):
+        x0, y0, x1, y1 = self.bounds(cluster)
+        grid = self.grid
+        dist = {source: 0}
+        queue = deque([source])
+        while queue:
+            x, y = queue.popleft()
+            d = dist[(x, y)] + 1
+            for dx, dy in STEPS:
+                nx, ny = x + dx, y + dy
+                if x0 <= nx < x1 and y0 <= ny < y1 and grid[ny][nx] == 0 and (nx, ny) not in dist:
+                    dist[(nx, ny)] = d
+                    queue.append((nx, ny))
+        stats["expansions"] += len(dist)
+        return dist
+
+    def local_path(self, start, goal, cluster):
+        x0, y0, x1, y1 = self.bounds(cluster)
+        grid = self.grid
+        frontier = [(0, start)]
+        came_from = {start: None}
+        cost_so_far = {start: 0}
+        expanded = 0
+        while frontier:
+            _, current = heapq.heappop(frontier)
+            expanded += 1
+            if current == goal:
+                break
+            x, y = current
+            for dx, dy in STEPS:
+                nx, ny = x + dx, y + dy
+                if x0 <= nx < x1 and y0 <= ny < y1 and grid[ny][nx] == 0:
+                    new_cost = cost_so_far[current] + 1
+                    nxt = (nx, ny)
+                    if nxt not in cost_so_far or new_cost < cost_so_far[nxt]:
+                        cost_so_far[nxt] = new_cost
+                        heapq.heappush(frontier, (new_cost + heuristic(goal, nxt), nxt))
+                        came_from[nxt] = current
+        stats["expansions"] += expanded
+
+        if goal not in came_from:
+            return None
+        path = []
+        cur = goal
+        while cur != start:
+            path.append(cur)
+            cur = came_from[cur]
+        path.reverse()
+        return path
+
+    def rebuild(self):
+        dirty = self.dirty
+        self.dirty = set()
+        self.fields.clear()
+        self.goal_requests.clear()
+        stats["rebuilds"] += 1
+
+        borders = set()
+        for cluster in dirty:
+            for other in self.neighbour_clusters(cluster):
+                borders.add(self.border_key(cluster, other))
+
+        for key in borders:
+            for cell_a, cell_b in self.border_pairs.get(key, []):
+                self.inter[cell_a].discard(cell_b)
+                self.inter[cell_b].discard(cell_a)
+                self.links.pop(cell_a, None)
+                self.links.pop(cell_b, None)
+            pairs = self.compute_border(*key)
+            self.border_pairs[key] = pairs
+            for cell_a, cell_b in pairs:
+                self.inter.setdefault(cell_a, set()).add(cell_b)
+                self.inter.setdefault(cell_b, set()).add(cell_a)
+
+        affected = set(dirty)
+        for cluster in dirty:
+            affected.update(self.neighbour_clusters(cluster))
+
+        for cluster in affected:
+            nodes = set()
+            for other in self.neighbour_clusters(cluster):
+                for cell_a, cell_b in self.border_pairs.get(self.border_key(cluster, other), []):
+                    nodes.add(cell_a if self.cluster_of(cell_a) == cluster else cell_b)
+            if cluster not in dirty and nodes == self.cluster_nodes.get(cluster):
+                continue
+            self.cluster_nodes[cluster] = nodes
+            self.segments.pop(cluster, None)
+            edges = {}
+            for node in nodes:
+                dist = self.local_distances(node, cluster)
+                edges[node] = {other: dist[other] for other in nodes if other != node and other in dist}
+            self.intra[cluster] = edges
+
+        # flatten intra and inter edges into one adjacency list per entrance cell
+        for cluster in affected:
+            for node, edges in self.intra[cluster].items():
+                self.links[node] = list(edges.items()) + [(other, 1) for other in self.inter.get(node, ())]
+
+    def find_path(self, start, goal):
+        started = time.perf_counter()
+        stats["queries"] += 1
+        path = self.search(start, goal)
+        if not path and start != goal:
+            stats["failures"] += 1
+        stats["time"] += time.perf_counter() - started
+        return path
+
+    def search(self, start, goal):
+        if start == goal:
+            return []
+        if not (0 <= start[0] < self.cols and 0 <= start[1] < self.rows):
+            return []
+        if not (0 <= goal[0] < self.cols and 0 <= goal[1] < self.rows) or self.grid[goal[1]][goal[0]] != 0:
+            return []
+        if self.dirty:
+            self.rebuild()
+
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(goal)
+        if start_cluster == goal_cluster:
+            path = self.local_path(start, goal, start_cluster)
+            if path is not None:
+                return path
+
+        # temporary links from start and goal to the entrances of their clusters
+        start_links = self.entrance_distances(start, start_cluster)
+        goal_links = None
+        field = self.fields.get(goal)
+        if field is not None:
+            self.fields.move_to_end(goal)
+        else:
+            goal_links = self.entrance_distances(goal, goal_cluster)
+            # a goal asked for twice (patrol points, a player several enemies chase) gets a distance field
+            self.goal_requests[goal] = self.goal_requests.get(goal, 0) + 1
+            if self.goal_requests[goal] >= 2:
+                field = self.distance_field(goal_links)
+                self.fields[goal] = field
+                if len(self.fields) > self.max_fields:
+                    self.fields.popitem(last=False)
+
+        if field is not None:
+            abstract = self.follow_field(start, goal, start_links, field)
+        else:
+            abstract = self.abstract_search(start, goal, start_links, goal_links)
+        if not abstract:
+            return []
+
+        path = []
+        for a, b in zip(abstract, abstract[1:]):
+            cluster = self.cluster_of(a)
+            if cluster != self.cluster_of(b):
+                path.append(b)
+            elif a != b:
+                path.extend(self.segment(a, b, cluster))
+        return path
+
+    def entrance_distances(self, cell, cluster):
+        dist = self.local_distances(cell, cluster)
+        return {n: dist[n] for n in self.cluster_nodes[cluster] if n in dist}
+
+    def segment(self, a, b, cluster):
+        nodes = self.cluster_nodes[cluster]
+        if a not in nodes or b not in nodes:
+            return self.local_path(a, b, cluster)
+        cache = self.segments.setdefault(cluster, {})
+        path = cache.get((a, b))
+        if path is None:
+            path = self.local_path(a, b, cluster)
+            cache[(a, b)] = path
+        return path
+
+    def distance_field(self, goal_links):
+        stats["fields"] += 1
+        dist = dict(goal_links)
+        toward = {}
+        frontier = [(d, n) for n, d in goal_links.items()]
+        heapq.heapify(frontier)
+        closed = set()
+        while frontier:
+            d, current = heapq.heappop(frontier)
+            if current in closed:
+                continue
+            closed.add(current)
+            stats["expansions"] += 1
+            for nxt, cost in self.links.get(current, ()):
+                new_cost = d + cost
+                if nxt not in dist or new_cost < dist[nxt]:
+                    dist[nxt] = new_cost
+                    toward[nxt] = current
+                    heapq.heappush(frontier, (new_cost, nxt))
+        return dist, toward
+
+    def follow_field(self, start, goal, start_links, field):
+        dist, toward = field
+        best = None
+        best_cost = None
+        for node, d in start_links.items():
+            if node in dist and (best is None or d + dist[node] < best_cost):
+                best = node
+                best_cost = d + dist[node]
+        if best is None:
+            return []
+        path = [start, best]
+        while path[-1] in toward:
+            path.append(toward[path[-1]])
+        path.append(goal)
+        return path
+
+    def abstract_search(self, start, goal, start_links, goal_links):
+        gx, gy = goal
+        frontier = [(0, start)]
+        came_from = {start: None}
+        cost_so_far = {start: 0}
+        closed = set()
+        while frontier:
+            _, current = heapq.heappop(frontier)
+            if current == goal:
+                break
+            if current in closed:
+                continue
+            closed.add(current)
+            stats["expansions"] += 1
+
+            links = self.links.get(current, [])
+            if current == start:
+                links = links + list(start_links.items())
+            if current in goal_links:
+                links = links + [(goal, goal_links[current])]
+            base = cost_so_far[current]
+            for nxt, cost in links:
+                new_cost = base + cost
+                if nxt not in cost_so_far or new_cost < cost_so_far[nxt]:
+                    cost_so_far[nxt] = new_cost
+                    heapq.heappush(frontier, (new_cost + abs(gx - nxt[0]) + abs(gy - nxt[1]), nxt))
+                    came_from[nxt] = current
+
+        if goal not in came_from:
+            return []
+        path = []
+        cur = goal
+        while cur is not None:
+            path.append(cur)
+            cur = came_from[cur]
+        path.reverse()
+        return path
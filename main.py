@@ -1,83 +1,136 @@
 import pygame
+import os
 import sys
 import random
 import time
-from settings import WIDTH, HEIGHT, FPS, BG_COLOR, TILE_SIZE, MAP_COLS, MAP_ROWS
+from settings import WIDTH, HEIGHT, FPS, TILE_SIZE, MAP_COLS, MAP_ROWS
 from player import Player
 from enemy import Enemy
 from tilemap import TileMap
-
-def reset_game(level=1):
-    tilemap = TileMap()
-    player_size = pygame.Vector2(20, 25)
+from render import Renderer, TextCache, ConsoleOverlay, load_font
+from assets import assets
+from triggers import events
+from telemetry import (
+    trace, FRAME, PHASE, LEVEL, POWERUP, LEVEL_REASON_IDS,
+    PHASE_EVENTS, PHASE_UPDATE, PHASE_RENDER, PHASE_PRESENT, PHASE_SLEEP
+)
+
+def center_pos_in_tile(tx, ty, size):
+    return (tx * TILE_SIZE + (TILE_SIZE - size.x) / 2,
+            ty * TILE_SIZE + (TILE_SIZE - size.y) / 2)
+
+def create_enemy(tilemap, level):
     enemy_size = pygame.Vector2(20, 35)
-
-    def center_pos_in_tile(tx, ty, size):
-        return (tx * TILE_SIZE + (TILE_SIZE - size.x) / 2,
-                ty * TILE_SIZE + (TILE_SIZE - size.y) / 2)
-
-    player_start = center_pos_in_tile(1, 1, player_size)
     free_tiles = [t for t in tilemap.get_free_tiles() if t != (1, 1)]
     enemy_tile = random.choice(free_tiles)
     enemy_pos = center_pos_in_tile(enemy_tile[0], enemy_tile[1], enemy_size)
 
-    player = Player(player_start, tilemap)
-
     enemy_speed = min(2.0 + level * 0.2, 5.0)
     enemy_chase_speed = min(3.0 + level * 0.3, 7.0)
     enemy_detect_radius = min(100 + level * 20, 300)
     enemy_lose_radius = enemy_detect_radius + 50
 
-    enemy = Enemy(enemy_pos, tilemap, speed=enemy_speed, chase_speed=enemy_chase_speed,
-                  detect_radius=enemy_detect_radius, lose_radius=enemy_lose_radius)
+    return Enemy(enemy_pos, tilemap, speed=enemy_speed, chase_speed=enemy_chase_speed,
+                 detect_radius=enemy_detect_radius, lose_radius=enemy_lose_radius)
 
-    goal_rect = pygame.Rect((MAP_COLS - 2) * TILE_SIZE + 5, (MAP_ROWS - 2) * TILE_SIZE + 5,
-                            TILE_SIZE - 10, TILE_SIZE - 10)
+def reset_game(level=1, map_size=(MAP_COLS, MAP_ROWS)):
+    cols, rows = map_size
+    tilemap = TileMap(cols=cols, rows=rows)
+    player_size = pygame.Vector2(20, 25)
 
-    return tilemap, player, enemy, goal_rect
+    player_start = center_pos_in_tile(1, 1, player_size)
+    player = Player(player_start, tilemap)
+    enemies = [create_enemy(tilemap, level)]
+
+    goal_x, goal_y = tilemap.goal
+    goal_rect = pygame.Rect(goal_x * TILE_SIZE + 5, goal_y * TILE_SIZE + 5, TILE_SIZE - 10, TILE_SIZE - 10)
+
+    return tilemap, player, enemies, goal_rect
+
+class Game:
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self.level = 1
+        self.map_size = (MAP_COLS, MAP_ROWS)
+        self.seed = None
+        self.speed_multiplier = 1.0
+        self.tasks = []
+        self.path_pool = None
+        self.reset(reason="start")
+
+    def reset(self, level=None, reason="console"):
+        if level is not None:
+            self.level = level
+        trace.record(LEVEL, LEVEL_REASON_IDS[reason], a=self.level)
+        if self.seed is not None:
+            random.seed(self.seed)
+        self.tilemap, self.player, self.enemies, self.goal_rect = reset_game(self.level, self.map_size)
+        if self.path_pool:
+            self.path_pool.attach(self.tilemap)
+        self.collected_goal = False
+        self.victory_time = 0
+        self.enemy_disabled_until = 0
+        self.slow_until = 0
+        self.player_in_trap = 0
+        # spawning on a portal should not count as stepping onto it
+        events.reset()
+        events.warp(self, self.player)
+
+    def spawn_enemies(self, count):
+        for _ in range(count):
+            self.enemies.append(create_enemy(self.tilemap, self.level))
+
+    def set_path_workers(self, count):
+        # ids from the old pool would never be answered
+        for enemy in self.enemies:
+            enemy.cancel_path_request()
+        if self.path_pool:
+            self.path_pool.close()
+            self.path_pool = None
+        if count:
+            from path_workers import PathWorkerPool
+            self.path_pool = PathWorkerPool(count)
+            self.path_pool.attach(self.tilemap)
 
 def get_vision_radius(level):
     steps = [float('inf'), 8, 6, 4, 2]
     index = level // 5
     return steps[min(index, len(steps)-1)]
 
-def draw_console(screen, font, history, input_text):
-    overlay = pygame.Surface((WIDTH, HEIGHT // 3))
-    overlay.fill((0, 0, 0))
-    overlay.set_alpha(200)
-
-    for i, line in enumerate(reversed(history[-8:])):
-        text = font.render(line, True, (0, 255, 0))
-        overlay.blit(text, (10, 5 + i * 24))
-
-    input_render = font.render("> " + input_text, True, (255, 255, 255))
-    overlay.blit(input_render, (10, HEIGHT // 3 - 28))
-    screen.blit(overlay, (0, HEIGHT - HEIGHT // 3))
-
 def main():
-    pygame.init()
+    # only the subsystems the game draws with; pygame.init() would also open audio
+    pygame.display.init()
+    pygame.font.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     clock = pygame.time.Clock()
-    font = pygame.font.SysFont("Consolas", 24)
+    font = load_font("consolas", 24)
+    renderer = Renderer(screen)
+    text_cache = TextCache()
+    if os.environ.get("GAME_TRACE"):
+        trace.start(os.environ["GAME_TRACE"])
+    console_overlay = ConsoleOverlay(font, text_cache, (WIDTH, HEIGHT // 3))
 
-    level = 1
-    tilemap, player, enemy, goal_rect = reset_game(level)
-    collected_goal = False
-    victory_display_time = 0
+    game = Game(renderer)
+    goal_surface = assets.get("fill", game.goal_rect.size, (255, 215, 0))
 
     last_super_time = time.time()
-    enemy_disabled_until = 0
-    slow_until = 0
-    player_in_trap = 0
     last_remove_trap_time = 0
 
     console_active = False
     console_history = []
     console_input = ""
+    # set by bench_startup.py to measure time-to-first-frame
+    exit_after_first_frame = bool(os.environ.get("GAME_EXIT_AFTER_FIRST_FRAME"))
 
     while True:
+        frame_start = time.perf_counter()
+        player = game.player
+        tilemap = game.tilemap
+
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                game.set_path_workers(0)
+                trace.stop()
                 pygame.quit()
                 sys.exit()
 
@@ -85,29 +138,10 @@ def main():
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_RETURN:
                         console_history.append("> " + console_input)
-                        cmd = console_input.strip().lower()
-
-                        if cmd.startswith("level "):
-                            try:
-                                level = int(cmd.split()[1])
-                                tilemap, player, enemy, goal_rect = reset_game(level)
-                                console_history.append(f"Level set to {level}")
-                            except:
-                                console_history.append("Invalid level")
-                        elif cmd == "next":
-                            level += 1
-                            tilemap, player, enemy, goal_rect = reset_game(level)
-                            console_history.append(f"Skipped to level {level}")
-                        elif cmd == "reset":
-                            tilemap, player, enemy, goal_rect = reset_game(level)
-                            console_history.append("Level reset")
-                        elif cmd == "heal":
-                            player.hp = player.max_hp
-                            console_history.append("Player healed")
-                        elif cmd == "help":
-                            console_history.append("Available: level [n], next, reset, heal, help")
-                        else:
-                            console_history.append(f"Unknown command: {cmd}")
+                        from console import commands
+                        console_history.extend(commands.execute(game, console_input))
+                        player = game.player
+                        tilemap = game.tilemap
                         console_input = ""
 
                     elif event.key == pygame.K_BACKSPACE:
@@ -125,6 +159,8 @@ def main():
                     console_input = ""
 
                 if event.type == pygame.KEYDOWN and time.time() - last_super_time >= 10:
+                    if pygame.K_1 <= event.key <= pygame.K_5:
+                        trace.record(POWERUP, event.key - pygame.K_0)
                     if event.key == pygame.K_1:
                         px, py = int(player.pos.x // TILE_SIZE), int(player.pos.y // TILE_SIZE)
                         for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
@@ -134,16 +170,18 @@ def main():
                                 break
                         last_super_time = time.time()
                     elif event.key == pygame.K_2:
-                        enemy_disabled_until = time.time() + 2
+                        game.enemy_disabled_until = time.time() + 2
                         last_super_time = time.time()
                     elif event.key == pygame.K_3:
-                        slow_until = time.time() + 5
+                        game.slow_until = time.time() + 5
                         last_super_time = time.time()
                     elif event.key == pygame.K_4:
                         player.pos = pygame.Vector2(*random.choice(tilemap.get_free_tiles())) * TILE_SIZE + pygame.Vector2(5, 5)
                         last_super_time = time.time()
                     elif event.key == pygame.K_5:
-                        enemy.pos = pygame.Vector2(*random.choice(tilemap.get_free_tiles())) * TILE_SIZE + pygame.Vector2(5, 5)
+                        free_tiles = tilemap.get_free_tiles()
+                        for enemy in game.enemies:
+                            enemy.pos = pygame.Vector2(*random.choice(free_tiles)) * TILE_SIZE + pygame.Vector2(5, 5)
                         last_super_time = time.time()
 
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_6 and time.time() - last_remove_trap_time >= 3:
@@ -153,69 +191,79 @@ def main():
                         if tilemap.is_trap(nx, ny) and not tilemap.is_wall(nx, ny):
                             tilemap.remove_trap(nx, ny)
                             last_remove_trap_time = time.time()
+                            trace.record(POWERUP, 6)
                             break
 
-        if not collected_goal and not console_active:
+        update_start = time.perf_counter()
+        trace.record(PHASE, PHASE_EVENTS, t=frame_start, value=(update_start - frame_start) * 1000)
+
+        if game.path_pool:
+            game.path_pool.poll()
+        enemies_active = time.time() > game.enemy_disabled_until
+        if not game.collected_goal and not console_active:
             player.handle_input()
-            if time.time() > enemy_disabled_until:
-                speed_mod = 0.5 if time.time() < slow_until else 1.0
-                enemy.update(player.pos, speed_mod)
+            if enemies_active:
+                speed_mod = 0.5 if time.time() < game.slow_until else 1.0
+                for enemy in game.enemies:
+                    enemy.update(player.pos, player.hp, speed_mod * game.speed_multiplier)
 
         player.regenerate()
 
+        # traps, portals and the goal only cost a tile comparison until the player changes tile
+        events.update(game, player)
+        if game.tilemap is not tilemap:
+            continue
+
         player_rect = pygame.Rect(player.pos.x, player.pos.y, player.size.x, player.size.y)
-        enemy_rect = pygame.Rect(enemy.pos.x, enemy.pos.y, enemy.size.x, enemy.size.y)
-
-        if not collected_goal and player_rect.colliderect(goal_rect):
-            collected_goal = True
-            victory_display_time = pygame.time.get_ticks()
-
-        if player_rect.colliderect(enemy_rect) and not collected_goal and time.time() > enemy_disabled_until:
-            tilemap, player, enemy, goal_rect = reset_game(level)
-            collected_goal = False
-            enemy_disabled_until = 0
-            slow_until = 0
-            player_in_trap = 0
+        if not game.collected_goal and enemies_active and any(
+            player_rect.colliderect(enemy.pos.x, enemy.pos.y, enemy.size.x, enemy.size.y)
+            for enemy in game.enemies
+        ):
+            game.reset(reason="caught")
             continue
 
-        tile_x = int(player.pos.x // TILE_SIZE)
-        tile_y = int(player.pos.y // TILE_SIZE)
-        if tilemap.is_trap(tile_x, tile_y):
-            if time.time() > player_in_trap:
-                player.take_damage(40)
-                player_in_trap = time.time() + 1
-                if player.hp <= 0:
-                    tilemap, player, enemy, goal_rect = reset_game(level)
-                    collected_goal = False
-                    continue
-
-        base_detect = min(100 + level * 20, 300)
-        hp_ratio = player.hp / player.max_hp
-        detect_radius = base_detect + (1 - hp_ratio) * 0.5 * base_detect
-        enemy.detect_radius = detect_radius
-        enemy.lose_radius = detect_radius + 50
-
-        screen.fill(BG_COLOR)
-        tilemap.draw(screen, player.pos, vision_radius=get_vision_radius(level))
-        if not collected_goal:
-            pygame.draw.rect(screen, (255, 215, 0), goal_rect)
-        player.draw(screen)
-        if time.time() > enemy_disabled_until:
-            enemy.draw(screen)
+        render_start = time.perf_counter()
+        trace.record(PHASE, PHASE_UPDATE, t=update_start, value=(render_start - update_start) * 1000)
+        if not game.collected_goal:
+            renderer.draw(goal_surface, game.goal_rect.topleft)
+        for surface, pos in player.sprites():
+            renderer.draw(surface, pos)
+        if enemies_active:
+            for enemy in game.enemies:
+                for surface, pos in enemy.sprites():
+                    renderer.draw(surface, pos)
+        renderer.draw(player.hud_surface(), (10, 10))
 
         if console_active:
-            draw_console(screen, font, console_history, console_input)
-
-        if collected_goal:
-            text = font.render(f"Level {level} complete!", True, (255, 255, 255))
-            screen.blit(text, (WIDTH // 2 - text.get_width() // 2, HEIGHT // 2))
-            if pygame.time.get_ticks() - victory_display_time > 1500:
-                level += 1
-                tilemap, player, enemy, goal_rect = reset_game(level)
-                collected_goal = False
-
-        pygame.display.flip()
+            changed = console_overlay.compose(console_history, console_input)
+            renderer.draw(console_overlay.surface, (0, HEIGHT - HEIGHT // 3), changed=changed)
+
+        if game.collected_goal:
+            text = text_cache.render(font, f"Level {game.level} complete!", (255, 255, 255))
+            renderer.draw(text, (WIDTH // 2 - text.get_width() // 2, HEIGHT // 2))
+            if pygame.time.get_ticks() - game.victory_time > 1500:
+                game.reset(game.level + 1, reason="complete")
+
+        present_start = time.perf_counter()
+        trace.record(PHASE, PHASE_RENDER, t=render_start, value=(present_start - render_start) * 1000)
+        renderer.present(game.tilemap, game.player.pos, get_vision_radius(game.level))
+        if exit_after_first_frame:
+            print(f"first_frame {time.time()}")
+            trace.stop()
+            pygame.quit()
+            return
+        sleep_start = time.perf_counter()
+        trace.record(PHASE, PHASE_PRESENT, t=present_start, value=(sleep_start - present_start) * 1000)
         clock.tick(FPS)
+        frame_end = time.perf_counter()
+        trace.record(PHASE, PHASE_SLEEP, t=sleep_start, value=(frame_end - sleep_start) * 1000)
+        work_ms = (sleep_start - frame_start) * 1000
+        frame_ms = (frame_end - frame_start) * 1000
+        trace.record(FRAME, a=int(work_ms * 1000), t=frame_start, value=frame_ms)
+
+        for task in game.tasks:
+            console_history.extend(task.update(frame_ms, work_ms))
+        game.tasks = [task for task in game.tasks if not task.done]
 
 if __name__ == "__main__":
     main()
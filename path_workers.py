@@ -0,0 +1,172 @@
+import multiprocessing
+import queue
+import signal
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+import astar
+
+# version counter, then one byte per tile
+HEADER = struct.Struct("<Q")
+
+
+class SharedGrid:
+    def __init__(self, grid, cols, rows):
+        self.cols = cols
+        self.rows = rows
+        self.shm = shared_memory.SharedMemory(create=True, size=HEADER.size + cols * rows)
+        for y, row in enumerate(grid):
+            start = HEADER.size + y * cols
+            self.shm.buf[start:start + cols] = bytes(row)
+        self.version = 0
+        HEADER.pack_into(self.shm.buf, 0, self.version)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def set_cell(self, x, y, value):
+        self.shm.buf[HEADER.size + y * self.cols + x] = value
+        self.version += 1
+        HEADER.pack_into(self.shm.buf, 0, self.version)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_rows(shm, cols, rows):
+    # memoryview rows index like the TileMap's lists, so astar runs on them unchanged
+    return [shm.buf[HEADER.size + y * cols:HEADER.size + (y + 1) * cols] for y in range(rows)]
+
+
+def worker_loop(requests, results):
+    # forked from the game, which has SDL's handlers; the pool stops us, not the keyboard
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shm = None
+    grid = []
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, name, cols, rows, start, goal = request
+        if shm is None or shm.name != name:
+            for row in grid:
+                row.release()
+            grid = []
+            if shm is not None:
+                shm.close()
+                shm = None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            except FileNotFoundError:
+                # the map was replaced while this request sat in the queue
+                continue
+            grid = attach_rows(shm, cols, rows)
+
+        # read before searching: the path is valid for at least this version
+        (seen,) = HEADER.unpack_from(shm.buf, 0)
+        expansions = astar.stats["expansions"]
+        # perf_counter is system-wide, so the game can place this on its own timeline
+        started = time.perf_counter()
+        path = astar.astar(grid, start, goal)
+        search_ms = (time.perf_counter() - started) * 1000
+        results.put((request_id, name, seen, path, astar.stats["expansions"] - expansions, started, search_ms))
+
+    for row in grid:
+        row.release()
+    if shm is not None:
+        shm.close()
+
+
+class PathWorkerPool:
+    def __init__(self, workers):
+        # workers must share our tracker, or each one would unlink grids it only borrowed
+        resource_tracker.ensure_running()
+        self.requests = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.processes = [
+            multiprocessing.Process(target=worker_loop, args=(self.requests, self.results), daemon=True)
+            for _ in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+        self.grid = None
+        self.tilemap = None
+        self.pending = {}
+        self.next_id = 0
+        self.stats = {"submitted": 0, "completed": 0, "outdated": 0}
+
+    def attach(self, tilemap):
+        if self.tilemap is not None:
+            self.tilemap.shared_grid = None
+            self.tilemap.path_pool = None
+        if self.grid is not None:
+            self.grid.close()
+        self.grid = SharedGrid(tilemap.map, tilemap.cols, tilemap.rows)
+        self.tilemap = tilemap
+        tilemap.shared_grid = self.grid
+        tilemap.path_pool = self
+        # answers already in flight for the old map are dropped in poll() by grid name
+        self.drop_queued()
+        self.pending.clear()
+
+    def drop_queued(self):
+        while True:
+            try:
+                self.requests.get_nowait()
+            except queue.Empty:
+                return
+
+    def submit(self, start, goal, callback):
+        request_id = self.next_id
+        self.next_id += 1
+        self.pending[request_id] = callback
+        grid = self.grid
+        self.requests.put((request_id, grid.name, grid.cols, grid.rows, start, goal))
+        self.stats["submitted"] += 1
+        return request_id
+
+    def cancel(self, request_id):
+        # a search already queued still runs, its answer is dropped in poll()
+        self.pending.pop(request_id, None)
+
+    def poll(self):
+        while True:
+            try:
+                request_id, name, version, path, expansions, started, search_ms = self.results.get_nowait()
+            except queue.Empty:
+                return
+            callback = self.pending.get(request_id)
+            if callback is None or name != self.grid.name:
+                continue
+            # walls only ever disappear, so a path from an older version is still walkable,
+            # just maybe not the shortest; the enemy's next re-plan picks up the change
+            if version != self.grid.version:
+                self.stats["outdated"] += 1
+            del self.pending[request_id]
+            self.stats["completed"] += 1
+            callback(request_id, path, expansions, started, search_ms)
+
+    def close(self):
+        self.drop_queued()
+        for _ in self.processes:
+            self.requests.put(None)
+        # keep reading results, a worker blocked on a full pipe never sees its stop marker
+        deadline = time.perf_counter() + 1
+        while any(p.is_alive() for p in self.processes) and time.perf_counter() < deadline:
+            try:
+                self.results.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        if self.tilemap is not None:
+            self.tilemap.shared_grid = None
+            self.tilemap.path_pool = None
+        if self.grid is not None:
+            self.grid.close()
+            self.grid = None
@@ -1,5 +1,7 @@
 import pygame
-from settings import PLAYER_SPEED, SHADOW_OFFSET, PLAYER_COLOR, SHADOW_COLOR, TILE_SIZE
+from settings import PLAYER_SPEED, SHADOW_OFFSET, PLAYER_COLOR, SHADOW_COLOR
+from assets import assets
+from collision import sweep
 
 class Player:
     def __init__(self, pos, tilemap):
@@ -7,12 +9,9 @@ class Player:
         self.size = pygame.Vector2(20, 20)
         self.tilemap = tilemap
 
-        self.image = pygame.Surface(self.size, pygame.SRCALPHA)
-        pygame.draw.rect(self.image, PLAYER_COLOR, (0, 0, *self.size))
-
-        self.shadow = pygame.Surface(self.size, pygame.SRCALPHA)
-        shadow_color = (*SHADOW_COLOR[:3], SHADOW_COLOR[3])
-        pygame.draw.rect(self.shadow, shadow_color, (0, 0, *self.size))
+        self.image = assets.get("fill", self.size, PLAYER_COLOR)
+        # uniform translucency: a per-surface alpha blits faster than a per-pixel one
+        self.shadow = assets.get("fill", self.size, SHADOW_COLOR[:3], surface_alpha=SHADOW_COLOR[3])
 
         self.max_hp = 100
         self.hp = self.max_hp
@@ -47,43 +46,12 @@ class Player:
             self.try_move(move)
 
     def try_move(self, move):
-        new_pos = self.pos + move
-        if not self.collides(new_pos):
-            self.pos = new_pos
-        else:
-            if not self.collides(self.pos + pygame.Vector2(move.x, 0)):
-                self.pos.x += move.x
-            elif not self.collides(self.pos + pygame.Vector2(0, move.y)):
-                self.pos.y += move.y
-
-    def collides(self, pos):
-        corners = [
-            pos,
-            pos + pygame.Vector2(self.size.x, 0),
-            pos + pygame.Vector2(0, self.size.y),
-            pos + self.size
-        ]
-        for corner in corners:
-            tile_x = int(corner.x // TILE_SIZE)
-            tile_y = int(corner.y // TILE_SIZE)
-            if self.tilemap.is_wall(tile_x, tile_y):
-                return True
-        return False
-
-    def draw(self, screen):
+        self.pos, normals = sweep(self.tilemap, self.pos, self.size, move)
+        return normals
 
+    def sprites(self):
         shadow_pos = self.pos + pygame.Vector2(SHADOW_OFFSET)
-        screen.blit(self.shadow, shadow_pos)
-        screen.blit(self.image, self.pos)
-
-
-        bar_width = 150
-        bar_height = 20
-        x, y = 10, 10
-
-        pygame.draw.rect(screen, (100, 0, 0), (x, y, bar_width, bar_height))
-
-        current_width = int(bar_width * (self.hp / self.max_hp))
-        pygame.draw.rect(screen, (0, 255, 0), (x, y, current_width, bar_height))
+        return [(self.shadow, shadow_pos), (self.image, self.pos)]
 
-        pygame.draw.rect(screen, (255, 255, 255), (x, y, bar_width, bar_height), 2)
+    def hud_surface(self):
+        return assets.get("health", (150, 20), (self.hp, self.max_hp), zoomable=False)
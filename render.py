@@ -0,0 +1,191 @@
+import json
+import math
+import os
+from collections import OrderedDict
+import pygame
+from settings import BG_COLOR, TILE_SIZE
+
+FONT_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "16bit-pygame", "fonts.json"
+)
+
+
+def to_display_format(surface, alpha=False):
+    # convert() needs a display mode; without one (editor, headless tools) keep the raw surface
+    if pygame.display.get_surface() is None:
+        return surface
+    return surface.convert_alpha() if alpha else surface.convert()
+
+
+def resolve_font(name):
+    try:
+        with open(FONT_CACHE_PATH) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    path = cache.get(name)
+    if name in cache and (path is None or os.path.exists(path)):
+        return path
+
+    # match_font scans every installed font, so its answer is kept across runs
+    path = pygame.font.match_font(name)
+    cache[name] = path
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_PATH), exist_ok=True)
+        with open(FONT_CACHE_PATH, "w") as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+    return path
+
+
+def load_font(name, size):
+    # None falls back to the font bundled with pygame
+    return pygame.font.Font(resolve_font(name), size)
+
+
+class Renderer:
+    def __init__(self, screen):
+        self.screen = screen
+        self.screen_rect = screen.get_rect()
+        # map_layer holds every tile, background is map_layer seen through the vision window
+        self.map_layer = to_display_format(pygame.Surface(self.screen_rect.size))
+        self.background = to_display_format(pygame.Surface(self.screen_rect.size))
+        self.tilemap = None
+        self.visible_rect = None
+        self.queue = []
+        self.prev_queue = []
+        self.forced = []
+        self.full_redraw = True
+        self.stats = {"frames": 0, "full_redraws": 0, "blits": 0, "rects": 0, "pixels": 0}
+
+    def draw(self, surface, pos, changed=False):
+        rect = surface.get_rect(topleft=(int(pos[0]), int(pos[1])))
+        self.queue.append((surface, rect))
+        # a surface redrawn in place looks unchanged to present(), so the caller flags it
+        if changed:
+            self.forced.append(rect)
+
+    def visible_area(self, player_pos, vision_radius):
+        if player_pos is None or math.isinf(vision_radius):
+            return self.screen_rect.copy()
+        reach = vision_radius * TILE_SIZE
+        left = math.ceil((player_pos.x - reach) / TILE_SIZE)
+        right = math.floor((player_pos.x + reach) / TILE_SIZE)
+        top = math.ceil((player_pos.y - reach) / TILE_SIZE)
+        bottom = math.floor((player_pos.y + reach) / TILE_SIZE)
+        area = pygame.Rect(left * TILE_SIZE, top * TILE_SIZE,
+                           max(0, right - left + 1) * TILE_SIZE,
+                           max(0, bottom - top + 1) * TILE_SIZE)
+        return area.clip(self.screen_rect)
+
+    def sync_background(self, tilemap, player_pos, vision_radius):
+        if tilemap is not self.tilemap:
+            self.tilemap = tilemap
+            self.map_layer.fill(BG_COLOR)
+            tilemap.draw(self.map_layer)
+            tilemap.changed_tiles.clear()
+            self.background.fill(BG_COLOR)
+            self.visible_rect = None
+            self.full_redraw = True
+
+        dirty = []
+        for x, y in tilemap.changed_tiles:
+            tile_rect = pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+            tilemap.draw_tile(self.map_layer, x, y)
+            if self.visible_rect is not None and self.visible_rect.colliderect(tile_rect):
+                self.background.blit(self.map_layer, tile_rect, tile_rect)
+                dirty.append(tile_rect)
+        tilemap.changed_tiles.clear()
+
+        visible = self.visible_area(player_pos, vision_radius)
+        if visible != self.visible_rect:
+            if self.visible_rect is not None:
+                self.background.fill(BG_COLOR, self.visible_rect)
+                dirty.append(self.visible_rect)
+            self.background.blit(self.map_layer, visible, visible)
+            dirty.append(visible)
+            self.visible_rect = visible
+        return dirty
+
+    def present(self, tilemap, player_pos=None, vision_radius=float('inf')):
+        bg_dirty = self.sync_background(tilemap, player_pos, vision_radius)
+        screen = self.screen
+
+        # every sprite is redrawn over restored background, so translucent
+        # sprites never blend onto their own previous frame
+        if self.full_redraw:
+            screen.blit(self.background, (0, 0))
+        else:
+            restore = bg_dirty + [rect for _, rect in self.prev_queue]
+            screen.blits([(self.background, rect, rect) for rect in restore], doreturn=False)
+        screen.blits(self.queue, doreturn=False)
+
+        stats = self.stats
+        stats["frames"] += 1
+        stats["blits"] += len(self.queue)
+        if self.full_redraw:
+            pygame.display.flip()
+            stats["full_redraws"] += 1
+            stats["rects"] += 1
+            stats["pixels"] += self.screen_rect.w * self.screen_rect.h
+        else:
+            # sprites drawn with the same surface at the same place are already on screen
+            current = {(surface, tuple(rect)) for surface, rect in self.queue}
+            previous = {(surface, tuple(rect)) for surface, rect in self.prev_queue}
+            changed = [rect for surface, rect in self.queue if (surface, tuple(rect)) not in previous]
+            changed += [rect for surface, rect in self.prev_queue if (surface, tuple(rect)) not in current]
+            update = bg_dirty + changed + self.forced
+            pygame.display.update(update)
+            stats["rects"] += len(update)
+            stats["pixels"] += sum(rect.w * rect.h for rect in update)
+
+        self.prev_queue = self.queue
+        self.queue = []
+        self.forced = []
+        self.full_redraw = False
+
+
+class TextCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def render(self, font, text, color, antialias=True):
+        key = (text, tuple(color), font, antialias)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            return surface
+        surface = to_display_format(font.render(text, antialias, color), alpha=True)
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+
+class ConsoleOverlay:
+    def __init__(self, font, text_cache, size, lines=8):
+        self.font = font
+        self.text_cache = text_cache
+        self.lines = lines
+        self.surface = to_display_format(pygame.Surface(size))
+        self.surface.set_alpha(200)
+        self.state = None
+
+    def compose(self, history, input_text):
+        state = (tuple(history[-self.lines:]), input_text)
+        if state == self.state:
+            return False
+        self.state = state
+
+        height = self.surface.get_height()
+        self.surface.fill((0, 0, 0))
+        for i, line in enumerate(reversed(history[-self.lines:])):
+            text = self.text_cache.render(self.font, line, (0, 255, 0))
+            self.surface.blit(text, (10, 5 + i * 24))
+
+        input_render = self.text_cache.render(self.font, "> " + input_text, (255, 255, 255))
+        self.surface.blit(input_render, (10, height - 28))
+        return True
@@ -10,6 +10,8 @@ ENEMY_SPEED = 2
 ENEMY_CHASE_SPEED = 3
 ENEMY_DETECT_RADIUS = 150
 ENEMY_LOSE_RADIUS = 250 
+PATH_CLUSTER_SIZE = 16
+ZOOM_LEVELS = (0.5, 0.75, 1.0, 1.5, 2.0)
 SHADOW_OFFSET = (5, 10)
 BG_COLOR = (30, 30, 30)
 
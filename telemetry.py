@@ -0,0 +1,104 @@
+import struct
+import threading
+import time
+
+MAGIC = b"PGTRACE1"
+# kind, sub, padding, perf_counter seconds, four int fields, float value
+RECORD = struct.Struct("<BBHdiiiif")
+
+FRAME, PHASE, PATH, LEVEL, POWERUP, STATE, DROPPED, WORKER_PATH = range(8)
+KINDS = ["frame", "phase", "path", "level", "powerup", "state", "dropped", "worker_path"]
+
+PHASE_EVENTS, PHASE_UPDATE, PHASE_RENDER, PHASE_PRESENT, PHASE_SLEEP = range(5)
+PHASES = ["events", "update", "render", "present", "sleep"]
+
+PATH_CHASE, PATH_RETURN = range(2)
+PATH_PURPOSES = ["chase", "return"]
+
+STATES = ["patrol", "chase", "return", "wait"]
+STATE_IDS = {name: i for i, name in enumerate(STATES)}
+
+LEVEL_REASONS = ["start", "caught", "trap", "complete", "console"]
+LEVEL_REASON_IDS = {name: i for i, name in enumerate(LEVEL_REASONS)}
+
+
+def pack_cell(cell):
+    return (cell[0] << 16) | (cell[1] & 0xFFFF)
+
+
+def unpack_cell(value):
+    return (value >> 16, value & 0xFFFF)
+
+
+class TraceRecorder:
+    def __init__(self, capacity=1 << 16):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * RECORD.size)
+        self.count = 0
+        self.flushed = 0
+        self.active = False
+        self.path = None
+        self.file = None
+        self.thread = None
+        self.stop_event = None
+
+    def start(self, path, flush_interval=0.5):
+        self.stop()
+        self.file = open(path, "wb")
+        self.file.write(MAGIC + struct.pack("<I", RECORD.size))
+        self.path = path
+        self.count = 0
+        self.flushed = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.flush_loop, args=(flush_interval,), daemon=True)
+        self.active = True
+        self.thread.start()
+
+    def stop(self):
+        if not self.active:
+            return
+        self.active = False
+        self.stop_event.set()
+        self.thread.join()
+        self.flush()
+        self.file.close()
+        self.file = None
+        self.thread = None
+
+    def record(self, kind, sub=0, a=0, b=0, c=0, d=0, value=0.0, t=None):
+        if not self.active:
+            return
+        if t is None:
+            t = time.perf_counter()
+        RECORD.pack_into(self.buffer, (self.count % self.capacity) * RECORD.size,
+                         kind, sub, 0, t, a, b, c, d, value)
+        self.count += 1
+
+    def flush_loop(self, interval):
+        while not self.stop_event.wait(interval):
+            self.flush()
+
+    def flush(self):
+        # runs on the flush thread; the main thread only ever advances count
+        end = self.count
+        start = self.flushed
+        if end == start:
+            return
+        size = RECORD.size
+        lost = end - start - self.capacity
+        if lost > 0:
+            start = end - self.capacity
+            self.file.write(RECORD.pack(DROPPED, 0, 0, time.perf_counter(), lost, 0, 0, 0, 0.0))
+
+        first = start % self.capacity
+        total = end - start
+        if first + total <= self.capacity:
+            chunk = bytes(self.buffer[first * size:(first + total) * size])
+        else:
+            chunk = bytes(self.buffer[first * size:]) + bytes(self.buffer[:(first + total - self.capacity) * size])
+        self.file.write(chunk)
+        self.file.flush()
+        self.flushed = end
+
+
+trace = TraceRecorder()
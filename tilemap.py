@@ -1,9 +1,13 @@
-import pygame
 import random
-from settings import TILE_SIZE, MAP_COLS, MAP_ROWS, WALL_COLOR, PATH_COLOR
+from settings import TILE_SIZE, MAP_COLS, MAP_ROWS, PATH_CLUSTER_SIZE
+from assets import assets
+import astar
+from astar import heuristic
 
 class TileMap:
-    def __init__(self, use_custom_map=False):
+    def __init__(self, use_custom_map=False, cols=MAP_COLS, rows=MAP_ROWS):
+        self.cols = cols
+        self.rows = rows
         if use_custom_map:
             self.map = []
             
@@ -14,42 +18,48 @@ class TileMap:
             self.portals = []
         else:
 
-            self.map = [[1 for _ in range(MAP_COLS)] for _ in range(MAP_ROWS)]
+            self.map = [[1 for _ in range(cols)] for _ in range(rows)]
             self.generate_maze()
-            self.traps = set(random.sample(self.get_free_tiles(), k=10))
-            self.portals = random.sample(self.get_free_tiles(), k=4)
+            free_tiles = self.get_free_tiles()
+            self.traps = set(random.sample(free_tiles, k=min(10, len(free_tiles))))
+            self.portals = random.sample(free_tiles, k=min(4, len(free_tiles)))
         
-        self.wall_surface = self.create_wall_surface()
-        self.path_surface = self.create_path_surface()
+        self.goal = (cols - 2, rows - 2)
+        self.changed_tiles = set()
+        self.planner = None
+        self.components = None
+        self.component_parent = []
+        # set by path_workers.PathWorkerPool.attach when paths are searched off-process
+        self.shared_grid = None
+        self.path_pool = None
+        self.tiles = assets.tiles(TILE_SIZE)
 
     def generate_maze(self):
-        def carve_passages(cx, cy):
-            directions = [(2, 0), (-2, 0), (0, 2), (0, -2)]
-            random.shuffle(directions)
-            for dx, dy in directions:
-                nx, ny = cx + dx, cy + dy
-                if 0 < nx < MAP_COLS-1 and 0 < ny < MAP_ROWS-1:
-                    if self.map[ny][nx] == 1:
-                        self.map[cy + dy//2][cx + dx//2] = 0
-                        self.map[ny][nx] = 0
-                        carve_passages(nx, ny)
-
+        # iterative depth-first carve: the recursive version overflows the stack on large maps
         self.map[1][1] = 0
-        carve_passages(1, 1)
-        self.map[MAP_ROWS-2][MAP_COLS-2] = 0
-
-    def create_wall_surface(self):
-        surf = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        surf.fill(WALL_COLOR)
-        for i in range(0, TILE_SIZE, 4):
-            pygame.draw.line(surf, (50, 50, 70), (i, 0), (i, TILE_SIZE))
-            pygame.draw.line(surf, (50, 50, 70), (0, i), (TILE_SIZE, i))
-        return surf
-
-    def create_path_surface(self):
-        surf = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        surf.fill(PATH_COLOR)
-        return surf
+        stack = [(1, 1, self.shuffled_directions())]
+        while stack:
+            cx, cy, directions = stack[-1]
+            if not directions:
+                stack.pop()
+                continue
+            dx, dy = directions.pop()
+            nx, ny = cx + dx, cy + dy
+            if 0 < nx < self.cols-1 and 0 < ny < self.rows-1:
+                if self.map[ny][nx] == 1:
+                    self.map[cy + dy//2][cx + dx//2] = 0
+                    self.map[ny][nx] = 0
+                    stack.append((nx, ny, self.shuffled_directions()))
+
+        self.map[self.rows-2][self.cols-2] = 0
+        if self.cols % 2 == 0 and self.rows % 2 == 0:
+            # the carve only reaches odd cells; with both sizes even the goal corner needs a link
+            self.map[self.rows-2][self.cols-3] = 0
+
+    def shuffled_directions(self):
+        directions = [(2, 0), (-2, 0), (0, 2), (0, -2)]
+        random.shuffle(directions)
+        return directions
 
     def draw(self, screen, player_pos=None, vision_radius=5):
         for y, row in enumerate(self.map):
@@ -62,31 +72,134 @@ class TileMap:
                         draw_tile = False
 
                 if draw_tile:
-                    pos = (x * TILE_SIZE, y * TILE_SIZE)
-                    if tile == 1:
-                        screen.blit(self.wall_surface, pos)
-                    else:
-                        screen.blit(self.path_surface, pos)
+                    self.draw_tile(screen, x, y)
 
-                    if (x, y) in self.traps:
-                        pygame.draw.circle(screen, (200, 0, 0), (x * TILE_SIZE + TILE_SIZE // 2, y * TILE_SIZE + TILE_SIZE // 2), 5)
+    def draw_tile(self, screen, x, y):
+        pos = (x * TILE_SIZE, y * TILE_SIZE)
+        if self.map[y][x] == 1:
+            screen.blit(self.tiles["wall"], pos)
+        else:
+            screen.blit(self.tiles["path"], pos)
 
-                    if (x, y) in self.portals:
-                        pygame.draw.circle(screen, (100, 255, 255), (x * TILE_SIZE + TILE_SIZE // 2, y * TILE_SIZE + TILE_SIZE // 2), 5)
+        if (x, y) in self.traps:
+            screen.blit(self.tiles["trap"], pos)
+
+        if (x, y) in self.portals:
+            screen.blit(self.tiles["portal"], pos)
 
     def is_wall(self, x, y):
-        if x < 0 or x >= MAP_COLS or y < 0 or y >= MAP_ROWS:
+        if x < 0 or x >= self.cols or y < 0 or y >= self.rows:
             return True
         return self.map[y][x] == 1
 
     def remove_wall(self, x, y):
-        if 0 <= x < MAP_COLS and 0 <= y < MAP_ROWS:
+        if 0 <= x < self.cols and 0 <= y < self.rows and self.map[y][x] != 0:
             self.map[y][x] = 0
+            self.changed_tiles.add((x, y))
+            if self.shared_grid:
+                self.shared_grid.set_cell(x, y, 0)
+            if self.planner:
+                self.planner.invalidate(x, y)
+            if self.components is not None:
+                self.join_components(x, y)
+
+    def label_components(self):
+        self.components = [[-1] * self.cols for _ in range(self.rows)]
+        self.component_parent = []
+        for y in range(self.rows):
+            for x in range(self.cols):
+                if self.map[y][x] != 0 or self.components[y][x] != -1:
+                    continue
+                label = len(self.component_parent)
+                self.component_parent.append(label)
+                self.components[y][x] = label
+                stack = [(x, y)]
+                while stack:
+                    cx, cy = stack.pop()
+                    for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                        nx, ny = cx + dx, cy + dy
+                        if 0 <= nx < self.cols and 0 <= ny < self.rows:
+                            if self.map[ny][nx] == 0 and self.components[ny][nx] == -1:
+                                self.components[ny][nx] = label
+                                stack.append((nx, ny))
+
+    def join_components(self, x, y):
+        # walls only ever disappear, so components can only merge
+        roots = set()
+        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            root = self.component_of(x + dx, y + dy)
+            if root is not None:
+                roots.add(root)
+        if roots:
+            label = roots.pop()
+            for root in roots:
+                self.component_parent[root] = label
+        else:
+            label = len(self.component_parent)
+            self.component_parent.append(label)
+        self.components[y][x] = label
+
+    def component_of(self, x, y):
+        if self.is_wall(x, y):
+            return None
+        if self.components is None:
+            self.label_components()
+        parent = self.component_parent
+        label = self.components[y][x]
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    def reachable(self, start, goal):
+        goal_component = self.component_of(*goal)
+        if goal_component is None:
+            return False
+        # a start inside a wall can still step out, leave that to the search
+        start_component = self.component_of(*start)
+        return start_component is None or start_component == goal_component
+
+    def nearest_reachable(self, start, goal, max_radius=3):
+        start_component = self.component_of(*start)
+        gx, gy = goal
+        for radius in range(1, max_radius + 1):
+            best = None
+            for y in range(gy - radius, gy + radius + 1):
+                for x in range(gx - radius, gx + radius + 1):
+                    if max(abs(x - gx), abs(y - gy)) != radius:
+                        continue
+                    component = self.component_of(x, y)
+                    if component is None or (start_component is not None and component != start_component):
+                        continue
+                    if best is None or heuristic(goal, (x, y)) < heuristic(goal, best):
+                        best = (x, y)
+            if best is not None:
+                return best
+        return None
+
+    def find_path(self, start, goal):
+        if not self.reachable(start, goal):
+            return []
+        # short hops stay on plain A*, long ones go through the cluster graph
+        if heuristic(start, goal) <= 2 * PATH_CLUSTER_SIZE:
+            return astar.astar(self.map, start, goal)
+        if self.planner is None:
+            # only maps larger than the default ever get here
+            from hpa import HierarchicalPlanner
+            self.planner = HierarchicalPlanner(self.map, self.cols, self.rows, PATH_CLUSTER_SIZE)
+        return self.planner.find_path(start, goal)
+
+    def path_expansions(self):
+        total = astar.stats["expansions"]
+        if self.planner is not None:
+            from hpa import stats
+            total += stats["expansions"]
+        return total
 
     def get_free_tiles(self):
         free_tiles = []
-        for y in range(MAP_ROWS):
-            for x in range(MAP_COLS):
+        for y in range(self.rows):
+            for x in range(self.cols):
                 if self.map[y][x] == 0:
                     free_tiles.append((x, y))
         return free_tiles
@@ -97,6 +210,16 @@ class TileMap:
     def is_portal(self, x, y):
         return (x, y) in self.portals
 
+    def features_at(self, x, y):
+        features = []
+        if (x, y) in self.traps:
+            features.append("trap")
+        if (x, y) in self.portals:
+            features.append("portal")
+        if (x, y) == self.goal:
+            features.append("goal")
+        return features
+
     def get_random_portal_except(self, current):
         other_portals = [p for p in self.portals if p != current]
         if other_portals:
@@ -105,4 +228,5 @@ class TileMap:
 
     def remove_trap(self, x, y):
         if (x, y) in self.traps:
-            self.traps.remove((x, y))
\ No newline at end of file
+            self.traps.remove((x, y))
+            self.changed_tiles.add((x, y))
\ No newline at end of file
@@ -0,0 +1,168 @@
+import argparse
+import json
+import struct
+import sys
+from collections import defaultdict
+from telemetry import (
+    MAGIC, RECORD, KINDS, PHASES, PATH_PURPOSES, STATES, LEVEL_REASONS,
+    FRAME, PHASE, PATH, LEVEL, POWERUP, STATE, DROPPED, WORKER_PATH, unpack_cell
+)
+
+
+def read_trace(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    header = len(MAGIC) + 4
+    if not data.startswith(MAGIC):
+        sys.exit(f"{path}: not a trace file")
+    (size,) = struct.unpack_from("<I", data, len(MAGIC))
+    if size != RECORD.size:
+        sys.exit(f"{path}: record size {size}, expected {RECORD.size}")
+    body = data[header:]
+    body = body[:len(body) - len(body) % size]
+    records = [(kind, sub, t, a, b, c, d, value) for kind, sub, _, t, a, b, c, d, value in RECORD.iter_unpack(body)]
+    records.sort(key=lambda r: r[2])
+    return records
+
+
+def split_frames(records):
+    # every non-frame record belongs to the frame whose span contains its timestamp
+    frames = [r for r in records if r[0] == FRAME]
+    grouped = [[] for _ in frames]
+    i = 0
+    for record in records:
+        if record[0] == FRAME:
+            continue
+        t = record[2]
+        while i + 1 < len(frames) and frames[i + 1][2] <= t:
+            i += 1
+        if frames and frames[i][2] <= t:
+            grouped[i].append(record)
+    return frames, grouped
+
+
+def bar(fraction, width=30):
+    return "#" * max(0, round(fraction * width))
+
+
+def print_breakdown(frames, grouped):
+    total = sum(f[7] for f in frames)
+    if not total:
+        print("No frames recorded")
+        return
+    phases = defaultdict(float)
+    paths = defaultdict(float)
+    worker_ms = 0.0
+    worker_paths = 0
+    for events in grouped:
+        for kind, sub, _, _, _, _, _, value in events:
+            if kind == PHASE:
+                phases[PHASES[sub]] += value
+            elif kind == PATH:
+                paths[PATH_PURPOSES[sub]] += value
+            elif kind == WORKER_PATH:
+                worker_ms += value
+                worker_paths += 1
+
+    print(f"Phase breakdown over {len(frames)} frames")
+    rows = [("frame", total, 0)]
+    for name in PHASES:
+        rows.append((name, phases[name], 1))
+        if name == "update":
+            rows.append(("pathfinding", sum(paths.values()), 2))
+            for purpose in PATH_PURPOSES:
+                rows.append((purpose, paths[purpose], 3))
+    for name, ms, depth in rows:
+        label = "  " * depth + name
+        print(f"  {label:<18} {ms:>11.1f} ms {100 * ms / total:6.1f}%  {bar(ms / total)}")
+    if worker_paths:
+        print(f"  {worker_paths} paths searched in worker processes: {worker_ms:.1f} ms, not part of frame time")
+
+
+def print_hitches(frames, grouped, threshold, limit):
+    hitches = [(f, events) for f, events in zip(frames, grouped) if f[7] > threshold]
+    print(f"\nHitches over {threshold:.1f} ms: {len(hitches)}")
+    if not frames:
+        return
+    origin = frames[0][2]
+    hitches.sort(key=lambda h: h[0][7], reverse=True)
+    for frame, events in hitches[:limit]:
+        phase_ms = {PHASES[e[1]]: e[7] for e in events if e[0] == PHASE}
+        worst = max(phase_ms, key=phase_ms.get) if phase_ms else "-"
+        path_events = [e for e in events if e[0] == PATH]
+        notes = []
+        if path_events:
+            notes.append(f"{len(path_events)} paths {sum(e[7] for e in path_events):.1f} ms")
+        for e in events:
+            if e[0] == LEVEL:
+                notes.append(f"level {e[3]} ({LEVEL_REASONS[e[1]]})")
+            elif e[0] == POWERUP:
+                notes.append(f"power-up {e[1]}")
+        print(f"  t={frame[2] - origin:9.3f}s {frame[7]:8.2f} ms  worst phase {worst:<8} {', '.join(notes)}")
+
+
+def chrome_trace(records):
+    origin = records[0][2] if records else 0.0
+    events = []
+    for kind, sub, t, a, b, c, d, value in records:
+        ts = (t - origin) * 1e6
+        if kind == FRAME:
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1, "ts": ts, "dur": value * 1000,
+                           "args": {"work_ms": a / 1000}})
+        elif kind == PHASE:
+            events.append({"name": PHASES[sub], "ph": "X", "pid": 1, "tid": 1, "ts": ts, "dur": value * 1000})
+        elif kind == PATH:
+            events.append({"name": f"path {PATH_PURPOSES[sub]}", "ph": "X", "pid": 1, "tid": 1, "ts": ts,
+                           "dur": value * 1000,
+                           "args": {"start": unpack_cell(a), "goal": unpack_cell(b), "expansions": c, "enemy": d}})
+        elif kind == STATE:
+            events.append({"name": f"enemy {a} {STATES[sub]}", "ph": "i", "s": "t", "pid": 1, "tid": 2, "ts": ts})
+        elif kind == LEVEL:
+            events.append({"name": f"level {a} ({LEVEL_REASONS[sub]})", "ph": "i", "s": "g", "pid": 1, "tid": 1, "ts": ts})
+        elif kind == POWERUP:
+            events.append({"name": f"power-up {sub}", "ph": "i", "s": "t", "pid": 1, "tid": 1, "ts": ts})
+        elif kind == WORKER_PATH:
+            events.append({"name": f"path {PATH_PURPOSES[sub]}", "ph": "X", "pid": 1, "tid": 3, "ts": ts,
+                           "dur": value * 1000,
+                           "args": {"start": unpack_cell(a), "goal": unpack_cell(b), "expansions": c, "enemy": d}})
+        elif kind == DROPPED:
+            events.append({"name": f"dropped {a} records", "ph": "i", "s": "g", "pid": 1, "tid": 1, "ts": ts})
+    events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "main loop"}})
+    events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": 2, "args": {"name": "enemy states"}})
+    events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": 3, "args": {"name": "path workers"}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a game telemetry trace")
+    parser.add_argument("trace")
+    parser.add_argument("--hitch-ms", type=float, default=None,
+                        help="frame time that counts as a hitch (default: 2x median frame time)")
+    parser.add_argument("--hitches", type=int, default=20, help="number of hitches to list")
+    parser.add_argument("--chrome", metavar="JSON", help="write Chrome trace-event JSON (chrome://tracing, Perfetto)")
+    args = parser.parse_args()
+
+    records = read_trace(args.trace)
+    counts = defaultdict(int)
+    for record in records:
+        counts[KINDS[record[0]]] += 1
+    print(f"{len(records)} records: " + ", ".join(f"{counts[k]} {k}" for k in KINDS if counts[k]))
+    dropped = sum(r[3] for r in records if r[0] == DROPPED)
+    if dropped:
+        print(f"warning: {dropped} records were overwritten before they could be flushed")
+
+    frames, grouped = split_frames(records)
+    print_breakdown(frames, grouped)
+    if frames:
+        durations = sorted(f[7] for f in frames)
+        threshold = args.hitch_ms if args.hitch_ms is not None else 2 * durations[len(durations) // 2]
+        print_hitches(frames, grouped, threshold, args.hitches)
+
+    if args.chrome:
+        with open(args.chrome, "w") as f:
+            json.dump(chrome_trace(records), f)
+        print(f"\nChrome trace written to {args.chrome}")
+
+
+if __name__ == "__main__":
+    main()
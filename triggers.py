@@ -0,0 +1,97 @@
+import time
+import pygame
+from settings import TILE_SIZE
+
+ENTER, STAY, EXIT = "enter", "stay", "exit"
+
+
+class TileEvents:
+    def __init__(self):
+        self.handlers = {}
+        self.tiles = {}
+        # entities standing on a trigger tile, with the features they entered
+        self.occupied = {}
+
+    def on(self, feature, *events):
+        def decorator(func):
+            for event in events:
+                self.handlers.setdefault((feature, event), []).append(func)
+            return func
+        return decorator
+
+    def reset(self):
+        self.tiles.clear()
+        self.occupied.clear()
+
+    def update(self, game, entity):
+        x = int(entity.pos.x // TILE_SIZE)
+        y = int(entity.pos.y // TILE_SIZE)
+        index = y * game.tilemap.cols + x
+        if self.tiles.get(entity) == index:
+            # polling only happens while somebody stands on a trigger
+            if entity in self.occupied:
+                features = game.tilemap.features_at(x, y)
+                if features:
+                    self.occupied[entity] = (x, y, features)
+                else:
+                    del self.occupied[entity]
+                self.dispatch(game, entity, (x, y), features, STAY)
+            return
+
+        self.tiles[entity] = index
+        left = self.occupied.pop(entity, None)
+        features = game.tilemap.features_at(x, y)
+        if features:
+            self.occupied[entity] = (x, y, features)
+        if left:
+            self.dispatch(game, entity, left[:2], left[2], EXIT)
+        self.dispatch(game, entity, (x, y), features, ENTER)
+
+    def warp(self, game, entity):
+        # record a teleport destination without firing its enter events
+        x = int(entity.pos.x // TILE_SIZE)
+        y = int(entity.pos.y // TILE_SIZE)
+        self.tiles[entity] = y * game.tilemap.cols + x
+        self.occupied.pop(entity, None)
+        features = game.tilemap.features_at(x, y)
+        if features:
+            self.occupied[entity] = (x, y, features)
+
+    def dispatch(self, game, entity, tile, features, event):
+        tilemap = game.tilemap
+        for feature in features:
+            for handler in self.handlers.get((feature, event), ()):
+                handler(game, entity, tile)
+                if game.tilemap is not tilemap:
+                    # the handler reset the level
+                    return
+
+
+events = TileEvents()
+
+
+@events.on("trap", ENTER, STAY)
+def trap_damage(game, entity, tile):
+    if entity is not game.player or time.time() <= game.player_in_trap:
+        return
+    entity.take_damage(40)
+    game.player_in_trap = time.time() + 1
+    if entity.hp <= 0:
+        game.reset(reason="trap")
+
+
+@events.on("portal", ENTER)
+def portal_teleport(game, entity, tile):
+    target = game.tilemap.get_random_portal_except(tile)
+    if target is None:
+        return
+    entity.pos = pygame.Vector2(target[0] * TILE_SIZE + (TILE_SIZE - entity.size.x) / 2,
+                                target[1] * TILE_SIZE + (TILE_SIZE - entity.size.y) / 2)
+    events.warp(game, entity)
+
+
+@events.on("goal", ENTER)
+def goal_reached(game, entity, tile):
+    if entity is game.player and not game.collected_goal:
+        game.collected_goal = True
+        game.victory_time = pygame.time.get_ticks()